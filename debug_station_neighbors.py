@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+站点邻居调试工具
+对比目标站点与其真实地理邻居的观测序列，用于排查空间验证结果
+"""
+
+import argparse
+import atexit
+import sqlite3
+import numpy as np
+import pandas as pd
+
+DB_PATH = 'weather_stream.db'
+TARGET_STATION = 'uth_volos'
+VARIABLE = 'out_hum'
+START = '2025-11-20 00:00:00'
+END = '2025-11-21 00:00:00'
+MAX_DISTANCE = 100  # km
+LIMIT = 5
+
+R = 6371.0  # 地球半径 (km)
+
+_CONN = None
+
+
+def get_conn():
+    """整个运行期共用一个只读连接，避免每次查询重新打开数据库"""
+    global _CONN
+    if _CONN is None:
+        _CONN = sqlite3.connect(DB_PATH)
+        atexit.register(_CONN.close)
+    return _CONN
+
+
+def haversine_distance(lat1, lon1, lats, lons):
+    """目标点到一组站点的大圆距离，向量化计算 (km)"""
+    phi1 = np.radians(lat1)
+    phi2 = np.radians(lats)
+    dphi = phi2 - phi1
+    dlam = np.radians(lons - lon1)
+    a = np.sin(dphi / 2)**2 + np.cos(phi1) * np.cos(phi2) * np.sin(dlam / 2)**2
+    return 2 * R * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+
+def find_real_neighbors(target_id, limit=LIMIT, max_distance=MAX_DISTANCE):
+    """按距离找出目标站点的真实地理邻居"""
+    stations = pd.read_sql_query(
+        "SELECT station_id, latitude, longitude, elevation FROM stations",
+        get_conn())
+
+    target = stations[stations['station_id'] == target_id]
+    if target.empty:
+        raise SystemExit(f"❌ 未找到站点: {target_id}")
+    t_lat = float(target['latitude'].iloc[0])
+    t_lon = float(target['longitude'].iloc[0])
+
+    # 一次向量化的 haversine 计算代替逐行 Python 循环
+    lats = stations['latitude'].to_numpy()
+    lons = stations['longitude'].to_numpy()
+    dists = haversine_distance(t_lat, t_lon, lats, lons)
+    dists[(stations['station_id'] == target_id).to_numpy()] = np.inf
+    dists[dists > max_distance] = np.inf
+
+    # top-k 用 argpartition，避免整表排序
+    k = min(limit, len(dists) - 1)
+    idx = np.argpartition(dists, k - 1)[:k] if k > 0 else np.array([], dtype=int)
+    idx = idx[np.isfinite(dists[idx])]
+    idx = idx[np.argsort(dists[idx])]
+
+    neighbors = []
+    for i in idx:
+        sid = stations['station_id'].iloc[i]
+        print(f"  邻居: {sid:<15} 距离 {dists[i]:6.1f} km")
+        neighbors.append(sid)
+    return neighbors
+
+
+def get_data(station_ids):
+    """一条 IN 查询取目标时间段内所有站点的观测序列"""
+    placeholders = ','.join('?' * len(station_ids))
+    df = pd.read_sql_query(
+        f"SELECT station_id, time, {VARIABLE} FROM observations"
+        f" WHERE station_id IN ({placeholders}) AND time BETWEEN ? AND ?"
+        " ORDER BY time",
+        get_conn(), params=list(station_ids) + [START, END])
+    df['time'] = pd.to_datetime(df['time'])
+    return df
+
+
+def main():
+    print(f"\n{'='*80}")
+    print(f"目标站点: {TARGET_STATION} | 变量: {VARIABLE}")
+    print(f"时间段: {START} ~ {END}")
+    print(f"{'='*80}\n")
+
+    neighbors = find_real_neighbors(TARGET_STATION)
+    if not neighbors:
+        print("❌ 范围内没有邻居")
+        return
+
+    headers = [TARGET_STATION] + neighbors
+    df = get_data(headers)
+    combined_df = df.pivot(index='time', columns='station_id', values=VARIABLE)
+    combined_df = combined_df.reindex(columns=headers)
+
+    print(f"\n{'Time':<20}" + "".join(f"{h:>14}" for h in headers))
+    print("-" * (20 + 14 * len(headers)))
+    # 整列向量化格式化，逐行输出用 itertuples 而不是 iterrows
+    formatted = combined_df.round(0).astype('Int64').astype(str)
+    formatted = (formatted + '%').where(combined_df.notna(), 'NaN')
+    lines = [f"{t!s:<20}" + "".join(f"{v:>14}" for v in vals)
+             for t, *vals in formatted.itertuples(index=True, name=None)]
+    print("\n".join(lines))
+    print()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='站点邻居数据对比')
+    parser.add_argument('--db', default=DB_PATH)
+    parser.add_argument('--station', default=TARGET_STATION)
+    parser.add_argument('--variable', default=VARIABLE)
+    parser.add_argument('--start', default=START)
+    parser.add_argument('--end', default=END)
+    args = parser.parse_args()
+    DB_PATH, TARGET_STATION, VARIABLE = args.db, args.station, args.variable
+    START, END = args.start, args.end
+    main()